@@ -1,7 +1,7 @@
+import threading
+
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.integrate import solve_ivp
 
 # --- CONFIGURATION ---
 st.set_page_config(page_title="Batch Adsorption Simulator", layout="wide")
@@ -21,7 +21,9 @@ with st.expander("ℹ️ Simulation Parameter Descriptions", expanded=True):
 
     - **Adsorption Rate Constant (k)**: A lumped kinetic parameter (1/min) that captures how quickly adsorption occurs. It reflects both mass transfer limitations and adsorption kinetics.
 
-    - **Langmuir Constant (KL)**: Defines how tightly the protein binds to the resin. A lower value means tighter binding (higher affinity); a higher value indicates weaker binding.
+    - **Langmuir Constant (KL)**: Defines how tightly the protein binds to the resin. Its meaning depends on the isotherm form: in the dissociation form (mg/mL), a lower value means tighter binding (higher affinity); in the affinity form (mL/mg), a higher value means tighter binding.
+
+    - **Isotherm Form**: Chooses how KL enters the Langmuir isotherm. In the dissociation form, q* = qmax·C/(KL + C), KL is in mg/mL and a lower KL means tighter binding. In the affinity form, q* = qmax·KL·C/(1 + KL·C), KL is in mL/mg and a higher KL means tighter binding. Both forms describe the same isotherm when one KL is the reciprocal of the other.
 
     - **Maximum Resin Capacity (qmax)**: The maximum amount of protein the resin can hold per mL of resin volume (mg/mL resin). This defines the adsorption saturation limit.
 
@@ -34,43 +36,164 @@ V_solution = 5.0  # mL
 
 # --- SIDEBAR USER INPUT ---
 st.sidebar.header("Adjust Simulation Parameters")
+isotherm_forms = ["Dissociation: qmax·C/(KL + C)", "Affinity: qmax·KL·C/(1 + KL·C)"]
+isotherm = st.sidebar.radio("Isotherm Form", isotherm_forms)
 c0 = st.sidebar.slider("Initial Concentration (C₀, mg/mL)", 1.0, 50.0, 20.0)
 k = st.sidebar.slider("Lumped Parameter Rate Constant (k, 1/min)", 0.01, 5.0, 1.0)
-KL = st.sidebar.slider("Langmuir Constant (KL, mL/mg)", 0.5, 100.0, 10.0)
+KL_units = "mg/mL" if isotherm == isotherm_forms[0] else "mL/mg"
+KL = st.sidebar.slider(f"Langmuir Constant (KL, {KL_units})", 0.5, 100.0, 10.0)
 qmax = st.sidebar.slider("Maximum Resin Capacity (qmax, mg/mL resin)", 10.0, 200.0, 65.0)
 t_end = st.sidebar.slider("Simulation Time (min)", 5, 30, 20)
+show_time_course = st.sidebar.checkbox("Show time course", value=True)
+
+st.sidebar.header("Parameter Sweep")
+sweep_param = st.sidebar.selectbox("Sweep Parameter", ["None", "C₀", "k", "KL", "qmax"])
+sweep_text = st.sidebar.text_input("Sweep Values (comma-separated)", "5, 20, 40")
 
 # --- DEFINE MODEL EQUATIONS ---
-def langmuir_odes(t, y):
-    C, q = y
-    dqdt = k * ((qmax * C) / (KL + C) - q)
-    dCdt = - (V_resin / V_solution) * dqdt
-    return [dCdt, dqdt]
-
-# --- SOLVE ODEs ---
-t_eval = np.linspace(0, t_end, 300)
-sol = solve_ivp(langmuir_odes, [0, t_end], [c0, 0.0], t_eval=t_eval, method='BDF')
-t, C, q = sol.t, sol.y[0], sol.y[1]
-
-# --- PLOT RESULTS ---
-fig, ax = plt.subplots(figsize=(8, 5))
-ax.plot(t, C, label="Liquid Concentration (mg/mL)", color="blue")
-ax.plot(t, q, label="Resin Loading (mg/mL resin)", color="green")
-ax.set_xlabel("Time (min)")
-ax.set_ylabel("Concentration / Loading")
-ax.set_title("Batch Adsorption Simulation (Langmuir Kinetics)")
-ax.legend()
-ax.grid(True)
-st.pyplot(fig)
+# The affinity form with KL is the dissociation form with 1/KL, so both
+# isotherms share one kernel and one set of cache entries.
+def dissociation_constant(KL):
+    return KL if isotherm == isotherm_forms[0] else 1.0 / KL
+
+# Imported on first use, so a run that only shows the equilibrium never loads
+# numba. Run build_kernels.py at deploy time to fill numba's on-disk cache, so
+# a cold worker does not pay JIT compilation on its first slider move.
+@st.cache_resource
+def load_kernels():
+    import langmuir_kernels
+    return langmuir_kernels
+
+# SciPy's odeint is not re-entrant on every supported version, and Streamlit
+# runs each session's script on its own thread, so sessions take turns on it.
+@st.cache_resource
+def odeint_lock():
+    return threading.Lock()
+
+# Fixed-step RK4 cost grows with lambda * t_end, where
+# lambda = k * (1 + V_resin/V_solution * qmax/KL) is the fast eigenvalue.
+# Past this product, LSODA's stiff BDF mode is faster.
+RK4_MAX_LAMBDA_T = 2000
+
+def integrate(kernels, lock, t, y0, k, KL, qmax, V_resin, V_solution):
+    lam = k * (1.0 + (V_resin / V_solution) * qmax / KL)
+    if lam * t[-1] <= RK4_MAX_LAMBDA_T:
+        return kernels.rk4(t, y0, k, KL, qmax, V_resin, V_solution)
+    from scipy.integrate import odeint
+    with lock:
+        # odeint hands Dfun the same extra args as the RHS, output buffer included.
+        params = (k, KL, qmax, V_resin, V_solution)
+        y = odeint(kernels.langmuir_rhs, y0, t, args=params + (np.empty(2),),
+                   Dfun=lambda y, t, *_: kernels.langmuir_jac(y, t, *params))
+    return y.astype(np.float32)
+
+def equilibrium(c0, qmax, KL, V_resin, V_solution):
+    # Langmuir isotherm q* = qmax*C*/(KL + C*) with the mass balance
+    # c0 = C* + (V_resin/V_solution)*q* gives C*^2 + b*C* - c0*KL = 0.
+    b = KL + (V_resin / V_solution) * qmax - c0
+    disc = np.sqrt(b * b + 4 * c0 * KL)
+    # Pick the form of the positive root that avoids cancellation.
+    C_star = (disc - b) / 2 if b < 0 else 2 * c0 * KL / (b + disc)
+    q_star = qmax * C_star / (KL + C_star)
+    return C_star, q_star
+
+# Plain function on purpose: a cache hit would hash the argument and unpickle
+# a copy, which costs more than building 100 floats.
+def teval(t_end):
+    return np.linspace(0.0, t_end, 100)
+
+# k only rescales time (dq/dt = k * f(C, q)), so integrate in tau = k * t with
+# unit rate: every (k, t_end) pair with the same k * t_end shares one cache entry.
+# Shared by every session on the server and keyed on float slider values, so capped.
+@st.cache_data(max_entries=1000)
+def simulate_scaled(c0, KL, qmax, tau_end, V_resin, V_solution):
+    y = integrate(load_kernels(), odeint_lock(), teval(tau_end), np.array([c0, 0.0]),
+                  1.0, KL, qmax, V_resin, V_solution)
+    return y[:, 0], y[:, 1]
+
+def simulate(c0, k, KL, qmax, t_end, V_resin, V_solution):
+    C, q = simulate_scaled(c0, KL, qmax, k * t_end, V_resin, V_solution)
+    return teval(t_end), C, q
+
+# Each sweep member gets its own integrate() call, and so its own solver and
+# step size: one stiff member does not slow down the rest.
+# Also keyed on user-typed sweep values, so capped.
+@st.cache_data(max_entries=100)
+def simulate_sweep(c0, k, KL, qmax, t_end, V_resin, V_solution):
+    t_plot = teval(t_end)
+    kernels, lock = load_kernels(), odeint_lock()
+    runs = [integrate(kernels, lock, t_plot, np.array([c0_j, 0.0]), k_j, KL_j, qmax_j,
+                      V_resin, V_solution)
+            for c0_j, k_j, KL_j, qmax_j in zip(c0, k, KL, qmax)]
+    C = np.column_stack([y[:, 0] for y in runs])
+    q = np.column_stack([y[:, 1] for y in runs])
+    return t_plot, C, q
+
+# --- SOLVE ODEs AND PLOT RESULTS ---
+if show_time_course:
+    t, C, q = simulate(c0, k, dissociation_constant(KL), qmax, t_end, V_resin, V_solution)
+
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_scatter(x=t, y=C, name="Liquid Concentration (mg/mL)", line=dict(color="blue"))
+    fig.add_scatter(x=t, y=q, name="Resin Loading (mg/mL resin)", line=dict(color="green"))
+    fig.update_layout(title="Batch Adsorption Simulation (Langmuir Kinetics)",
+                      xaxis_title="Time (min)", yaxis_title="Concentration / Loading")
+    st.plotly_chart(fig, use_container_width=True)
 
 # --- FINAL VALUES ---
+# The state at t_end matches the plotted curves; the closed-form equilibrium is
+# what they approach, and is all that is shown when the integration is skipped.
+C_eq, q_eq = equilibrium(c0, qmax, dissociation_constant(KL), V_resin, V_solution)
 st.subheader("📊 Final State")
-st.write(f"**Equilibrium Liquid Concentration**: {C[-1]:.2f} mg/mL")
-st.write(f"**Equilibrium Resin Loading**: {q[-1]:.2f} mg/mL resin")
+if show_time_course:
+    st.write(f"**Liquid Concentration at {t_end} min**: {C[-1]:.2f} mg/mL  \n"
+             f"**Resin Loading at {t_end} min**: {q[-1]:.2f} mg/mL resin")
+st.write(f"**Equilibrium Liquid Concentration**: {C_eq:.2f} mg/mL  \n"
+         f"**Equilibrium Resin Loading**: {q_eq:.2f} mg/mL resin")
+
+# --- PARAMETER SWEEP ---
+if sweep_param != "None":
+    try:
+        sweep_values = [float(v) for v in sweep_text.split(",") if v.strip()]
+    except ValueError:
+        sweep_values = []
+    # k = 0 is a valid (non-adsorbing) case; the other parameters divide or
+    # set a scale and must be strictly positive.
+    if not sweep_values:
+        st.sidebar.error("Enter one or more numeric sweep values, separated by commas.")
+    elif not all(np.isfinite(v) and (v >= 0 if sweep_param == "k" else v > 0) for v in sweep_values):
+        limit = "zero or greater" if sweep_param == "k" else "greater than zero"
+        st.sidebar.error(f"Sweep values for {sweep_param} must be finite and {limit}.")
+    else:
+        n = len(sweep_values)
+        params = {"C₀": [c0] * n, "k": [k] * n, "KL": [KL] * n, "qmax": [qmax] * n}
+        params[sweep_param] = sweep_values
+        params["KL"] = [dissociation_constant(v) for v in params["KL"]]
+        t_s, C_s, q_s = simulate_sweep(tuple(params["C₀"]), tuple(params["k"]), tuple(params["KL"]),
+                                       tuple(params["qmax"]), t_end, V_resin, V_solution)
+
+        st.subheader(f"📈 Parameter Sweep over {sweep_param}")
+        import plotly.graph_objects as go
+        from plotly.colors import DEFAULT_PLOTLY_COLORS
+
+        fig_s = go.Figure()
+        for j, value in enumerate(sweep_values):
+            color = DEFAULT_PLOTLY_COLORS[j % len(DEFAULT_PLOTLY_COLORS)]
+            fig_s.add_scatter(x=t_s, y=C_s[:, j], name=f"{sweep_param} = {value:g}: Liquid",
+                              line=dict(color=color))
+            fig_s.add_scatter(x=t_s, y=q_s[:, j], name=f"{sweep_param} = {value:g}: Resin",
+                              line=dict(color=color, dash="dash"))
+        fig_s.update_layout(title="Parameter Sweep (solid: liquid, dashed: resin)",
+                            xaxis_title="Time (min)", yaxis_title="Concentration / Loading")
+        st.plotly_chart(fig_s, use_container_width=True)
 
 # --- CONCEPTUAL QUESTIONS ---
 with st.expander("🧠 Making Sense of the Simulation", expanded=False):
     st.markdown("""
+*The KL values and trends below are for the **dissociation** isotherm form. In the affinity form, KL is the reciprocal (KL_affinity = 1/KL_dissociation), so "low KL" and "high KL" swap meaning.*
+
 ### 1. What factors control how fast the system reaches equilibrium?
 **Try this:**  
 Set `k = 0.2`, run the simulation. Then increase to `k = 2.0`.  
@@ -104,7 +227,8 @@ Use `qmax = 20`, `65`, and `100` with fixed `C₀ = 20`.
 Run with `KL = 0.01`, `0.1`, and `0.5`. Keep `C₀ = 20`, `qmax = 65`.
 
 **What should you observe?**  
-- **Answer**: Lower `KL` values indicate **tighter binding** (higher affinity). When `KL` is small, the resin binds more strongly even at low concentrations, resulting in lower final liquid concentration. At high `KL`, weaker binding results in less adsorption.
+- **Answer**: In the dissociation form, lower `KL` values indicate **tighter binding** (higher affinity). When `KL` is small, the resin binds more strongly even at low concentrations, resulting in lower final liquid concentration. At high `KL`, weaker binding results in less adsorption.
+- In the affinity form the trend is reversed: higher `KL` means **tighter binding** and a lower final liquid concentration. To reproduce the cases above, use `KL = 100`, `10`, and `2`.
 
 ---
 
@@ -115,7 +239,7 @@ Run with `KL = 0.01`, `0.1`, and `0.5`. Keep `C₀ = 20`, `qmax = 65`.
 Hold other values constant.
 
 **What should you observe?**  
-- **Answer**: When C₀ is low, **binding affinity (KL)** matters more than `qmax`. If KL is high (weak binding), little protein adsorbs. Even if `qmax` is large, low affinity limits adsorption.
+- **Answer**: When C₀ is low, **binding affinity (KL)** matters more than `qmax`. If binding is weak (high KL in the dissociation form, low KL in the affinity form), little protein adsorbs. Even if `qmax` is large, low affinity limits adsorption.
 
 ---
 
@@ -133,5 +257,5 @@ Run with `t_end = 5`, `15`, and `30` minutes for the same parameter set.
 Try to reduce final liquid concentration below `1 mg/mL`.
 
 **What should you observe?**  
-- **Answer**: Use **high `qmax`**, **low KL** (tight binding), and a **moderate-to-high k**. Also, avoid starting with a very high C₀. This will maximize adsorption and reduce unbound protein.
+- **Answer**: Use **high `qmax`**, **tight binding** (low KL in the dissociation form, high KL in the affinity form), and a **moderate-to-high k**. Also, avoid starting with a very high C₀. This will maximize adsorption and reduce unbound protein.
 """)
@@ -0,0 +1,19 @@
+"""Precompile the simulator's Numba kernels into Numba's on-disk cache.
+
+Run ``python build_kernels.py`` once at deploy time, as the user that serves
+the app. Each kernel is called with the argument types Batch1.py uses, so a
+cold Streamlit worker loads machine code from the cache instead of compiling
+on its first slider move. Numba checks the cache against the kernel source
+and recompiles by itself if langmuir_kernels.py has changed since the build.
+"""
+import numpy as np
+
+import langmuir_kernels
+
+params = (1.0, 10.0, 65.0, 0.35, 5.0)
+y = np.array([20.0, 0.0])
+
+if __name__ == "__main__":
+    langmuir_kernels.rk4(np.linspace(0.0, 20.0, 100), y, *params)
+    langmuir_kernels.langmuir_rhs(y, 0.0, *params, np.empty(2))
+    langmuir_kernels.langmuir_jac(y, 0.0, *params)